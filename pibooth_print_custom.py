@@ -1,7 +1,8 @@
 # pibooth_print_custom.py
 # ---------------------------------------------------------------------
 # Custom ESC/POS printer plugin for Pibooth
-# - Builds a command line to call /home/seb/print_raster.py
+# - Imports /home/seb/print_raster.py once and calls its run() in-process
+#   (or feeds a persistent "print_raster.py --daemon" worker if worker = True)
 # - Configurable through [ESC_POS] section in pibooth.cfg
 # - Boolean flags + numeric/path options with "empty = disabled" behavior
 # - Includes "limit_lines" and "pre_cancel" (flush/reset before printing)
@@ -9,9 +10,13 @@
 # ---------------------------------------------------------------------
 
 import os
+import json
 import shlex
-import subprocess
+import atexit
 import logging
+import subprocess
+import importlib.util
+from dataclasses import dataclass
 import pibooth
 from pibooth.printer import Printer
 
@@ -36,6 +41,9 @@ def pibooth_configure(cfg):
                    "Thermal printer serial device (default: /dev/ttyS0)")
     cfg.add_option(SECTION, "target_width", 384,
                    "Target image width in pixels (default: 384)")
+    cfg.add_option(SECTION, "worker", False,
+                   "Run the script in a persistent worker process (--daemon) instead of "
+                   "in-process, for isolation (default: False)")
 
     # Serial speed (string to allow empty => disabled => script default 9600)
     cfg.add_option(SECTION, "baudrate", "9600",
@@ -61,9 +69,10 @@ def pibooth_configure(cfg):
     cfg.add_option(SECTION, "gamma", "",
                    "Gamma correction. Empty = disabled. (default: disabled)")
     cfg.add_option(SECTION, "chunk", "4096",
-                   "Serial write chunk size in bytes. Empty = disabled. (default: 4096)")
-    cfg.add_option(SECTION, "line_sleep", "0.02",
-                   "Pause between raster bands in seconds. Empty = disabled. (default: 0.02)")
+                   "Serial write chunk size in bytes, used with line_sleep. Empty = disabled. (default: 4096)")
+    cfg.add_option(SECTION, "line_sleep", "",
+                   "Send raster band by band with this pause in seconds (buggy firmwares only). "
+                   "Empty = disabled: whole raster in one write. (default: disabled)")
     cfg.add_option(SECTION, "limit_lines", "",
                    "Limit number of printed lines (debug/paper save). Empty = disabled. (default: disabled)")
 
@@ -74,13 +83,212 @@ def pibooth_configure(cfg):
                    "Path to save ESC/POS stream to file (no print). Empty = disabled. (default: disabled)")
 
 
+@dataclass(frozen=True)
+class EscPosCfg:
+    """
+    Typed snapshot of the [ESC_POS] section, read once instead of per copy.
+    Numeric/path options stay stripped strings ("" = disabled).
+    """
+    script_path: str
+    serial_device: str
+    target_width: int
+    worker: bool
+    baudrate: str
+    no_autorotate: bool
+    pre_cancel: bool
+    invert: bool
+    no_dither: bool
+    threshold: str
+    contrast: str
+    gamma: str
+    chunk: str
+    line_sleep: str
+    limit_lines: str
+    preview: str
+    dry_run: str
+
+    @classmethod
+    def from_cfg(cls, cfg):
+        def text(key):
+            return (cfg.get(SECTION, key) or "").strip()
+
+        return cls(
+            script_path=cfg.get(SECTION, "script_path"),
+            serial_device=cfg.get(SECTION, "serial_device"),
+            target_width=cfg.getint(SECTION, "target_width"),
+            worker=cfg.getboolean(SECTION, "worker"),
+            baudrate=text("baudrate"),
+            no_autorotate=cfg.getboolean(SECTION, "no_autorotate"),
+            pre_cancel=cfg.getboolean(SECTION, "pre_cancel"),
+            invert=cfg.getboolean(SECTION, "invert"),
+            no_dither=cfg.getboolean(SECTION, "no_dither"),
+            threshold=text("threshold"),
+            contrast=text("contrast"),
+            gamma=text("gamma"),
+            chunk=text("chunk"),
+            line_sleep=text("line_sleep"),
+            limit_lines=text("limit_lines"),
+            preview=text("preview"),
+            dry_run=text("dry_run"),
+        )
+
+
 class CustomPrinter(Printer):
     """
-    Custom Pibooth printer that shells out to print_raster.py using configured flags.
+    Custom Pibooth printer that runs print_raster.py in-process using configured flags.
     """
     def __init__(self, name, max_pages, options, cfg):
         super().__init__(name, max_pages, options)
         self.cfg = cfg
+        self._cfg_cache = None
+        self._cfg_mtime = None
+        self._raster = None
+        self._worker = None
+        self._ser = None
+        self._load_cfg()
+        atexit.register(self.close)
+        if not self._cfg_cache.worker:
+            self._load_raster_module()
+
+    def _cfg_file_mtime(self):
+        """Modification time of pibooth.cfg (None if unknown)."""
+        try:
+            return os.path.getmtime(self.cfg.filename)
+        except (AttributeError, OSError, TypeError):
+            return None
+
+    def _load_cfg(self):
+        """
+        Parse the [ESC_POS] section into self._cfg_cache.
+        Re-parsed only when pibooth.cfg has been saved since (e.g. settings menu).
+        """
+        mtime = self._cfg_file_mtime()
+        if self._cfg_cache is None or mtime != self._cfg_mtime:
+            old = self._cfg_cache
+            self._cfg_cache = EscPosCfg.from_cfg(self.cfg)
+            self._cfg_mtime = mtime
+            if old is not None and old.script_path != self._cfg_cache.script_path:
+                # Script moved: drop the imported module / running worker
+                self._raster = None
+                self._stop_worker()
+            if old is not None and old.worker and not self._cfg_cache.worker:
+                # Worker disabled: don't leave the --daemon process idle until exit
+                self._stop_worker()
+            if old is not None and (old.serial_device, old.baudrate) != \
+                    (self._cfg_cache.serial_device, self._cfg_cache.baudrate):
+                self._close_serial()
+        return self._cfg_cache
+
+    def close(self):
+        """
+        Release the serial port and the worker.
+        Called by the pibooth_cleanup hook, and at interpreter exit (atexit).
+        """
+        self._close_serial()
+        self._stop_worker()
+
+    def _load_raster_module(self):
+        """
+        Import print_raster.py (from script_path) once and cache it.
+        Returns None (and logs) if the script is missing or fails to import.
+        """
+        if self._raster is not None:
+            return self._raster
+
+        script_path = self._cfg_cache.script_path
+        if not os.path.exists(script_path):
+            LOGGER.error("[ESC_POS] Print script not found: %s", script_path)
+            return None
+
+        try:
+            spec = importlib.util.spec_from_file_location("print_raster", script_path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+        except Exception:
+            LOGGER.exception("[ESC_POS] Unable to import print script: %s", script_path)
+            return None
+
+        self._raster = module
+        return module
+
+    # ---------- Persistent serial port (in-process) ----------
+
+    def _close_serial(self):
+        """Close the shared serial port; it is reopened on next print."""
+        ser, self._ser = self._ser, None
+        if ser is not None:
+            try:
+                ser.close()
+            except Exception:
+                pass
+
+    def _print_on_serial(self, raster, args):
+        """
+        Print one copy on the shared serial port (opened on first use).
+        A port kept from a previous print may have gone stale (printer unplugged):
+        it is checked without sending anything and reopened if needed. Once bytes
+        have been sent, errors are not retried (no partial copy printed twice).
+        """
+        if self._ser is not None and not raster.port_alive(self._ser):
+            LOGGER.warning("[ESC_POS] Reused serial port unusable, reopening %s", args.serial_flag)
+            self._close_serial()
+        if self._ser is None:
+            self._ser = raster.open_serial(args.serial_flag, args.baud)
+        try:
+            raster.print_job(self._ser, args)
+        except Exception:
+            # Next print starts from a freshly opened port
+            self._close_serial()
+            raise
+
+    # ---------- Persistent worker (worker = True) ----------
+
+    def _get_worker(self):
+        """Start "print_raster.py --daemon" if not running yet and return it."""
+        if self._worker is not None and self._worker.poll() is None:
+            return self._worker
+
+        script_path = self._cfg_cache.script_path
+        if not os.path.exists(script_path):
+            LOGGER.error("[ESC_POS] Print script not found: %s", script_path)
+            return None
+
+        LOGGER.info("[ESC_POS] Starting print worker: %s --daemon", script_path)
+        # stderr is inherited: job logs are returned in the status line, so
+        # nothing accumulates in an unread pipe
+        self._worker = subprocess.Popen(["python3", script_path, "--daemon"],
+                                        stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        text=True, bufsize=1)
+        return self._worker
+
+    def _stop_worker(self):
+        """Terminate the worker process (plugin teardown / interpreter exit)."""
+        worker, self._worker = self._worker, None
+        if worker is None or worker.poll() is not None:
+            return
+        try:
+            worker.stdin.close()  # EOF => the worker loop ends cleanly
+            worker.wait(timeout=2)
+        except Exception:
+            worker.terminate()
+
+    def _run_in_worker(self, worker, cmd, keep_log):
+        """Send one job to the worker and return (ok, exit code, error, output)."""
+        try:
+            worker.stdin.write(json.dumps({"argv": cmd, "log": keep_log}) + "\n")
+            worker.stdin.flush()
+            line = worker.stdout.readline()
+        except (BrokenPipeError, OSError) as e:
+            line = ""
+            LOGGER.warning("[ESC_POS] Print worker pipe error: %s", e)
+
+        if not line:
+            # Worker died: it will be restarted on next job
+            self._stop_worker()
+            return False, worker.poll(), "print worker exited unexpectedly", ""
+
+        status = json.loads(line)
+        return status.get("ok", False), status.get("code"), status.get("error", ""), status.get("log", "")
 
     # ---------- Small helpers to safely add flags ----------
 
@@ -113,96 +321,139 @@ class CustomPrinter(Printer):
     # ---------- Command builder ----------
 
     def build_command(self, filename):
-        """Build the full subprocess command to call print_raster.py."""
-        script_path = self.cfg.get(SECTION, "script_path")
-        serial_device = self.cfg.get(SECTION, "serial_device")
-        target_width = str(self.cfg.getint(SECTION, "target_width"))
+        """Build the print_raster.py argument list (same flags as the CLI)."""
+        conf = self._cfg_cache
 
         cmd = [
-            "python3", script_path,
             "--print", filename,
-            "--dev", serial_device,
-            "--width", target_width,
+            "--dev", conf.serial_device,
+            "--width", str(conf.target_width),
         ]
 
         # Serial speed (empty => use script default)
-        self._add_numeric_option(cmd, "--baud", self.cfg.get(SECTION, "baudrate"), int)
+        self._add_numeric_option(cmd, "--baud", conf.baudrate, int)
 
         # Boolean flags
-        self._add_bool_flag(cmd, "--no-autorotate", self.cfg.getboolean(SECTION, "no_autorotate"))
-        self._add_bool_flag(cmd, "--pre-cancel", self.cfg.getboolean(SECTION, "pre_cancel"))
-        self._add_bool_flag(cmd, "--invert", self.cfg.getboolean(SECTION, "invert"))
-
-        no_dither = self.cfg.getboolean(SECTION, "no_dither")
-        self._add_bool_flag(cmd, "--no-dither", no_dither)
+        self._add_bool_flag(cmd, "--no-autorotate", conf.no_autorotate)
+        self._add_bool_flag(cmd, "--pre-cancel", conf.pre_cancel)
+        self._add_bool_flag(cmd, "--invert", conf.invert)
+        self._add_bool_flag(cmd, "--no-dither", conf.no_dither)
 
         # Numeric/float options (empty => disabled)
         # NOTE: threshold is only used by the script when --no-dither is enabled
-        thr_value = (self.cfg.get(SECTION, "threshold") or "").strip()
-        if no_dither:
-            self._add_numeric_option(cmd, "--threshold", thr_value, int)
+        if conf.no_dither:
+            self._add_numeric_option(cmd, "--threshold", conf.threshold, int)
         # If no_dither is False and threshold is set, script ignores it—no need to warn every time
 
-        self._add_numeric_option(cmd, "--contrast", self.cfg.get(SECTION, "contrast"), float)
-        self._add_numeric_option(cmd, "--gamma", self.cfg.get(SECTION, "gamma"), float)
-        self._add_numeric_option(cmd, "--chunk", self.cfg.get(SECTION, "chunk"), int)
-        self._add_numeric_option(cmd, "--line-sleep", self.cfg.get(SECTION, "line_sleep"), float)
-        self._add_numeric_option(cmd, "--limit-lines", self.cfg.get(SECTION, "limit_lines"), int)
+        self._add_numeric_option(cmd, "--contrast", conf.contrast, float)
+        self._add_numeric_option(cmd, "--gamma", conf.gamma, float)
+        self._add_numeric_option(cmd, "--chunk", conf.chunk, int)
+        self._add_numeric_option(cmd, "--line-sleep", conf.line_sleep, float)
+        self._add_numeric_option(cmd, "--limit-lines", conf.limit_lines, int)
 
         # Debug outputs (empty => disabled)
-        self._add_path_option(cmd, "--preview", self.cfg.get(SECTION, "preview"))
-        self._add_path_option(cmd, "--dry-run", self.cfg.get(SECTION, "dry_run"))
+        self._add_path_option(cmd, "--preview", conf.preview)
+        self._add_path_option(cmd, "--dry-run", conf.dry_run)
 
         return cmd
 
+    def _full_command(self, cmd):
+        """Command equivalent to a job: python3 <script_path> <arguments>."""
+        return ["python3", self._cfg_cache.script_path] + cmd
+
+    def _command_line(self, cmd):
+        """Shell command equivalent to a job (for logs: can be pasted to reproduce it)."""
+        return shlex.join(self._full_command(cmd))
+
     # ---------- Printing entry point ----------
 
     def print_file(self, filename, copies=1):
         """
         Main printing logic called by Pibooth.
-        - Builds the command line from configuration
-        - Runs the script as a subprocess
-        - Logs stdout/stderr for troubleshooting
+        - Builds the print_raster.py arguments from configuration
+        - Prints in-process (serial port kept open, payload cached), or sends
+          each copy to the worker
+        - Logs the script output for troubleshooting
+        Failures are raised as subprocess.CalledProcessError in both modes
+        (returncode = print_raster.py exit code).
         """
         if not filename or not os.path.exists(filename):
             LOGGER.warning("[ESC_POS] No photo to print (missing file).")
             return
 
-        script_path = self.cfg.get(SECTION, "script_path")
-        if not os.path.exists(script_path):
-            LOGGER.error("[ESC_POS] Print script not found: %s", script_path)
-            return
+        conf = self._load_cfg()
+        if conf.worker:
+            raster, worker = None, self._get_worker()
+            if worker is None:
+                return
+        else:
+            raster, worker = self._load_raster_module(), None
+            if raster is None:
+                return
 
-        serial_device = self.cfg.get(SECTION, "serial_device")
-        target_width = self.cfg.getint(SECTION, "target_width")
         LOGGER.info("[ESC_POS] Printing via ESC/POS")
         LOGGER.info("[ESC_POS] Image: %s", filename)
-        LOGGER.info("[ESC_POS] Script: %s | Serial: %s | Width: %d px", script_path, serial_device, target_width)
-
+        LOGGER.info("[ESC_POS] Script: %s | Serial: %s | Width: %d px",
+                    conf.script_path, conf.serial_device, conf.target_width)
+
+        # Same file and configuration for every copy: build the arguments once
+        cmd = self.build_command(filename)
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            LOGGER.debug("[ESC_POS] Command: %s", self._command_line(cmd))
+        args = None  # in-process: parsed once, under the error handling below
+        # The script output is only logged at INFO: don't accumulate it otherwise
+        keep_log = LOGGER.isEnabledFor(logging.INFO)
+
+        # In-process: the serial port stays open between copies and sessions; the
+        # ESC/POS payload is cached by print_raster, so copies 2..N only resend it
         for i in range(copies):
             LOGGER.info("[ESC_POS] Start copy %d/%d", i + 1, copies)
-            cmd = self.build_command(filename)
-            cmd_str = " ".join(shlex.quote(p) for p in cmd)
-            LOGGER.debug("[ESC_POS] Command: %s", cmd_str)
 
-            try:
-                res = subprocess.run(cmd, check=True, capture_output=True, text=True)
-                if res.stdout:
-                    LOGGER.debug("[ESC_POS] print_raster.py stdout:\n%s", res.stdout.strip())
-                if res.stderr:
-                    # The script logs to stderr by design; treat it as info, not as an error
-                    LOGGER.info("[ESC_POS] print_raster.py stderr:\n%s", res.stderr.strip())
-                LOGGER.info("[ESC_POS] Copy %d/%d finished.", i + 1, copies)
-            except subprocess.CalledProcessError as e:
-                LOGGER.error(
-                    "[ESC_POS] Printing failure (exit code %s)\n"
-                    "Command: %s\n"
-                    "STDOUT :\n%s\n"
-                    "STDERR :\n%s",
-                    e.returncode, cmd_str, (e.stdout or "").strip(), (e.stderr or "").strip()
-                )
-                # Re-raise so Pibooth can react (counters, UI, etc.)
-                raise
+            if worker is not None:
+                ok, code, error, output = self._run_in_worker(worker, cmd, keep_log)
+                if not ok:
+                    LOGGER.error(
+                        "[ESC_POS] Printing failure (exit code %s: %s)\n"
+                        "Command: %s\n"
+                        "OUTPUT :\n%s",
+                        code, error, self._command_line(cmd), output.strip()
+                    )
+                    # Raise so Pibooth can react (counters, UI, etc.)
+                    raise subprocess.CalledProcessError(code or 1, self._full_command(cmd), output=output)
+            else:
+                with raster.capture_log(keep_log) as buf:
+                    try:
+                        if args is None:
+                            args = raster.parse_args(cmd)
+                        if args.dry_run:
+                            raster.run(args)
+                        else:
+                            self._print_on_serial(raster, args)
+                    except Exception as e:
+                        code, error = raster.describe_error(e)
+                        LOGGER.error(
+                            "[ESC_POS] Printing failure (exit code %s: %s)\n"
+                            "Command: %s\n"
+                            "OUTPUT :\n%s",
+                            code, error, self._command_line(cmd), buf.getvalue().strip()
+                        )
+                        # Same exception as in worker mode (and as the former subprocess call),
+                        # so Pibooth can react (counters, UI, etc.)
+                        raise subprocess.CalledProcessError(code, self._full_command(cmd),
+                                                            output=buf.getvalue()) from e
+                output = buf.getvalue()
+
+            if output:
+                # The script logs to stderr by design; treat it as info, not as an error
+                LOGGER.info("[ESC_POS] print_raster.py output:\n%s", output.strip())
+            LOGGER.info("[ESC_POS] Copy %d/%d finished.", i + 1, copies)
+
+
+@pibooth.hookimpl
+def pibooth_cleanup(app):
+    printer = getattr(app, "printer", None)
+    if isinstance(printer, CustomPrinter):
+        printer.close()
 
 
 @pibooth.hookimpl
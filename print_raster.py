@@ -17,6 +17,10 @@ Modes :
     b) Flags :
         python print_raster.py --print <image> --dev <serial> --width <px> [--baud 9600] [options...]
 
+  Worker persistant (utilisé par le plugin Pibooth, option worker) :
+        python print_raster.py --daemon
+    → un job JSON par ligne sur stdin (liste d'arguments ci-dessus), un statut JSON par ligne sur stdout
+
 Options utiles (debug / rendu) :
   --preview out.png          : enregistre l'image 1‑bit réellement envoyée (aperçu)
   --dry-run out.bin          : écrit le flux ESC/POS dans un fichier, n'imprime PAS
@@ -27,48 +31,140 @@ Options utiles (debug / rendu) :
   --invert                   : inverse noir/blanc (utile si polarité inversée)
   --limit-lines N            : n'imprime que les N premières lignes (debug, économie papier)
   --no-autorotate            : désactive la rotation portrait automatique
-  --chunk 4096               : taille des sous-écritures série
-  --line-sleep 0.02          : pause entre bandes envoyées
+  --chunk 4096               : taille des sous-écritures série (si --line-sleep)
+  --line-sleep 0.02          : envoi par bandes avec pause (défaut 0 = un seul write)
   --pre-cancel               : envoie un cancel/reset avant impression
 
 Par défaut : --baud 9600 (stable sur ta tête).
 """
 
+from __future__ import annotations
+
+import io
 import sys
 import os
 import time
+import json
+import struct
 import argparse
-from PIL import Image, ImageOps, ImageEnhance
-
-# Pillow: gestion des API dépréciées
-try:
-    from PIL.Image import Resampling
-    RESAMPLING = Resampling.LANCZOS
-except Exception:
-    RESAMPLING = Image.LANCZOS
-
-try:
-    # Pillow >= 9
-    DITHER_FS = Image.Dither.FLOYDSTEINBERG
-    DITHER_NONE = Image.Dither.NONE
-except Exception:
-    # Compat anciens Pillow
-    DITHER_FS = 1
-    DITHER_NONE = 0
-
-try:
-    import serial
-except ImportError:
-    sys.stderr.write("[ERREUR] 'pyserial' manquant (installe: pip install pyserial)\n")
-    sys.exit(1)
+import functools
+import contextlib
+
+# Pillow / numpy / pyserial sont importés au premier usage (_load_pil / _load_serial) :
+# importer ce module depuis le plugin ne coûte rien au démarrage de Pibooth.
+Image = ImageOps = ImageEnhance = None
+RESAMPLING = DITHER_FS = DITHER_NONE = None
+np = None       # numpy, optionnel : accélère seuillage et gamma
+serial = None
+
+
+# Timeout d'écriture par défaut (s) ; allongé par send_payload() selon la taille du flux
+WRITE_TIMEOUT = 10
+
+# Séquences ESC/POS constantes (un seul write() chacune)
+_CANCEL_RESET_SEQ = (b'\x18\x18\x18'    # CAN (Cancel) x3
+                     b'\x1b@'           # ESC @ (reset)
+                     b'\n\n'            # avance papier
+                     b'\x1dV\x01')      # cut partiel (inoffensif si non supporté)
+_INIT_PROLOGUE = b'\x1b@\x1b2'         # ESC @ init + ESC 2 interligne par défaut
+_END_EPILOGUE = b'\n\n\n\x1dV\x01'      # avance papier + cut partiel si supporté
+_HELLO_SEQ = b'\x1b@' + b'Hello ESC/POS!\n\n' + b'\x1dV\x01'
+# En-tête de bande GS v 0 (m=0) : commande, largeur en octets, hauteur (little-endian)
+_RASTER_HDR = struct.Struct('<4sHH')
+_RASTER_CMD = b'\x1d\x76\x30\x00'
+
+
+class RasterError(Exception):
+    """Erreur d'impression avec le code de sortie à utiliser en mode CLI."""
+
+    def __init__(self, msg: str, exit_code: int):
+        super().__init__(msg)
+        self.exit_code = exit_code
+
+
+def _load_pil():
+    """Importe Pillow (+ numpy si présent) au premier traitement d'image."""
+    global Image, ImageOps, ImageEnhance, RESAMPLING, DITHER_FS, DITHER_NONE, np
+    if Image is not None:
+        return
+    from PIL import Image as _Image, ImageOps as _ImageOps, ImageEnhance as _ImageEnhance
+
+    # Pillow: gestion des API dépréciées
+    try:
+        from PIL.Image import Resampling
+        RESAMPLING = Resampling.LANCZOS
+    except Exception:
+        RESAMPLING = _Image.LANCZOS
+
+    try:
+        # Pillow >= 9
+        DITHER_FS = _Image.Dither.FLOYDSTEINBERG
+        DITHER_NONE = _Image.Dither.NONE
+    except Exception:
+        # Compat anciens Pillow
+        DITHER_FS = 1
+        DITHER_NONE = 0
+
+    try:
+        import numpy
+        np = numpy
+    except ImportError:
+        np = None
+
+    ImageOps, ImageEnhance = _ImageOps, _ImageEnhance
+    Image = _Image
+
+
+def _load_serial():
+    """Importe pyserial à la première ouverture de port."""
+    global serial
+    if serial is None:
+        try:
+            import serial as _serial
+        except ImportError:
+            raise RasterError("'pyserial' manquant (installe: pip install pyserial)", 1)
+        serial = _serial
+    return serial
+
+
+# Destination de log() : None = sys.stderr (CLI), sinon le buffer de capture_log()
+_log_sink = None
 
 
 def log(msg: str):
-    sys.stderr.write("[PRINT] " + msg + "\n")
+    out = sys.stderr if _log_sink is None else _log_sink
+    out.write("[PRINT] " + msg + "\n")
+
+
+class _DiscardLog(io.TextIOBase):
+    """Sortie jetable pour capture_log(keep=False)."""
+
+    def write(self, s: str) -> int:
+        return len(s)
+
+    def getvalue(self) -> str:
+        return ""
+
+
+@contextlib.contextmanager
+def capture_log(keep: bool = True):
+    """
+    Redirige log() vers un StringIO pendant un job appelé en interne (plugin / worker).
+    keep=False : les logs sont jetés sans être accumulés.
+    Seul log() est redirigé : sys.stderr (warnings, autres threads) n'est pas touché.
+    """
+    global _log_sink
+    buf = io.StringIO() if keep else _DiscardLog()
+    previous, _log_sink = _log_sink, buf
+    try:
+        yield buf
+    finally:
+        _log_sink = previous
 
 
 def open_serial(dev: str, baud: int):
     """Ouvre le port série en 8N1, flow control OFF, timeouts actifs."""
+    _load_serial()
     log(f"Ouvre {dev} @ {baud} 8N1, sans flow control")
     return serial.Serial(
         dev,
@@ -77,20 +173,31 @@ def open_serial(dev: str, baud: int):
         parity='N',
         stopbits=1,
         timeout=2,          # lecture
-        write_timeout=10,   # écriture (évite blocage infini)
+        write_timeout=WRITE_TIMEOUT,   # écriture (évite blocage infini)
         xonxoff=False,
         rtscts=False,
         dsrdtr=False
     )
 
 
+def port_alive(ser: serial.Serial) -> bool:
+    """
+    Vérifie, sans rien envoyer à l'imprimante, qu'un port gardé ouvert entre deux
+    impressions est encore utilisable (imprimante débranchée/rebranchée, etc.).
+    """
+    try:
+        # Simple lecture de la file de sortie : ne jette pas les octets encore en attente
+        ser.out_waiting
+        return True
+    except Exception as e:
+        log(f"Port série inutilisable: {e}")
+        return False
+
+
 def cancel_and_reset(ser: serial.Serial):
     """Tentative d'annulation d'un job en cours + reset imprimante."""
     log("Envoi Cancel (CAN) + Reset (ESC @)")
-    ser.write(b'\x18\x18\x18')     # CAN (Cancel) x3
-    ser.write(b'\x1b@')            # ESC @ (reset)
-    ser.write(b'\n\n')             # avance papier
-    ser.write(b'\x1dV\x01')        # cut partiel (inoffensif si non supporté)
+    ser.write(_CANCEL_RESET_SEQ)
     ser.flush()
     time.sleep(0.1)
 
@@ -98,19 +205,26 @@ def cancel_and_reset(ser: serial.Serial):
 def send_hello(ser: serial.Serial):
     ser.reset_input_buffer()
     ser.reset_output_buffer()
-    ser.write(b'\x1b@')               # init
-    ser.write(b'Hello ESC/POS!\n\n')
-    ser.write(b'\x1dV\x01')           # cut partiel si dispo
+    ser.write(_HELLO_SEQ)
     ser.flush()
     log("Hello envoyé")
 
 
+@functools.lru_cache(maxsize=8)
+def _gamma_lut(gamma: float) -> bytes:
+    """LUT 256 octets pour un gamma donné (mémoïsée : même gamma à chaque impression)."""
+    if np is not None:
+        lut = (np.arange(256) / 255.0) ** (1.0 / gamma) * 255 + 0.5
+        return lut.clip(0, 255).astype(np.uint8).tobytes()
+    return bytes(min(255, int((i / 255.0) ** (1.0 / gamma) * 255 + 0.5)) for i in range(256))
+
+
 def apply_gamma(imgL: Image.Image, gamma: float) -> Image.Image:
     """Application simple d'un gamma sur une image niveaux de gris."""
     if abs(gamma - 1.0) < 1e-3:
         return imgL
-    lut = [min(255, int((i / 255.0) ** (1.0 / gamma) * 255 + 0.5)) for i in range(256)]
-    return imgL.point(lut)
+    _load_pil()
+    return imgL.point(_gamma_lut(round(gamma, 3)))
 
 
 def prepare_image(path: str,
@@ -121,7 +235,8 @@ def prepare_image(path: str,
                   threshold: int,
                   autorotate: bool,
                   preview: str | None):
-    """Charge, redimensionne, convertit en 1‑bit et renvoie (image1bit, bytes bruts)."""
+    """Charge, redimensionne, convertit en 1‑bit et renvoie (largeur, hauteur, bytes bruts)."""
+    _load_pil()
     log(f"Charge image: {path}")
     img = Image.open(path).convert('RGB')
 
@@ -140,84 +255,168 @@ def prepare_image(path: str,
         imgL = ImageEnhance.Contrast(imgL).enhance(contrast)
     imgL = apply_gamma(imgL, gamma)
 
+    img1 = None
     if use_dither:
         img1 = imgL.convert('1', dither=DITHER_FS)
         method = "dither=FS"
     else:
         th = int(threshold)
-        # Seuil fixe → 0 (noir) si < th, 255 (blanc) sinon
-        img1 = imgL.point(lambda p: 0 if p < th else 255).convert('1', dither=DITHER_NONE)
+        # Seuil fixe → 0 (noir) si < th, 1/255 (blanc) sinon
+        if np is not None:
+            # Comparaison vectorisée + bits packés par ligne (même format que '1'.tobytes()),
+            # sans image '1' intermédiaire
+            arr = np.frombuffer(imgL.tobytes(), np.uint8).reshape(h, w)
+            mask = arr >= th
+            raw_bytes = np.packbits(mask, axis=1).tobytes()
+            white = int(np.count_nonzero(mask))
+            black = mask.size - white
+        else:
+            lut = bytes(0 if p < th else 255 for p in range(256))
+            img1 = imgL.point(lut).convert('1', dither=DITHER_NONE)
         method = f"no-dither threshold={th}"
 
-    # Stat noir/blanc via histogramme (pour '1', valeurs 0 et 255)
-    hist = img1.histogram()
-    black = hist[0] if len(hist) > 0 else 0
-    white = hist[255] if len(hist) > 255 else 0
+    if img1 is not None:
+        # Stat noir/blanc via histogramme (pour '1', valeurs 0 et 255)
+        hist = img1.histogram()
+        black = hist[0] if len(hist) > 0 else 0
+        white = hist[255] if len(hist) > 255 else 0
+        raw_bytes = img1.tobytes()  # bits packés (MSB→pixel gauche), row-major
     total = black + white if (black + white) > 0 else 1
     black_ratio = 100.0 * black / total
-    log(f"Image prête: {img1.width}x{img1.height} (1-bit, {method}, noir={black_ratio:.1f}%)")
+    log(f"Image prête: {w}x{h} (1-bit, {method}, noir={black_ratio:.1f}%)")
 
     if preview:
         try:
+            if img1 is None:
+                img1 = Image.frombytes('1', (w, h), raw_bytes)
             img1.save(preview)
             log(f"Preview écrit: {preview}")
         except Exception as e:
             log(f"Preview échec: {e}")
 
-    raw_bytes = img1.tobytes()  # bits packés (MSB→pixel gauche), row-major
-    return img1, raw_bytes
+    return w, h, raw_bytes
+
+
+# Table d'inversion octet → ~octet (bytes.translate = boucle C)
+_INVERT_TABLE = bytes(255 - i for i in range(256))
 
 
 def invert_bits(buf: bytes) -> bytes:
-    return bytes((~b) & 0xFF for b in buf)
+    return buf.translate(_INVERT_TABLE)
 
 
-def build_raster_bands(img1: Image.Image,
+def build_raster_bands(width: int,
+                       height: int,
                        raw_bytes: bytes,
                        invert: bool,
                        limit_lines: int | None):
-    """Prépare l'itération par bandes ≤255 lignes pour GS v 0 (m=0)."""
-    width_bytes = (img1.width + 7) // 8
-    height = img1.height if not limit_lines else min(limit_lines, img1.height)
+    """Découpe le raster en bandes ≤255 lignes pour GS v 0 (m=0), renvoyées sous forme de liste."""
+    width_bytes = (width + 7) // 8
+    height = height if not limit_lines else min(limit_lines, height)
 
     if invert:
         raw_bytes = invert_bits(raw_bytes)
 
-    def iter_bands():
-        y = 0
-        while y < height:
-            slice_h = min(255, height - y)
-            header = b'\x1d\x76\x30\x00' + bytes([
-                width_bytes & 0xFF, (width_bytes >> 8) & 0xFF,
-                slice_h & 0xFF, (slice_h >> 8) & 0xFF
-            ])
-            start = y * width_bytes
-            end = start + slice_h * width_bytes
-            yield (y, slice_h, header, memoryview(raw_bytes)[start:end])
-            y += slice_h
-
-    log(f"Raster: {img1.width} px ({width_bytes} bytes/ligne) x {height} lignes")
-    return width_bytes, height, iter_bands
+    # Toutes les bandes pleines partagent le même en-tête : une seule construction
+    full_header = _RASTER_HDR.pack(_RASTER_CMD, width_bytes, 255)
+
+    # (y, hauteur, en-tête, données) par bande ; les memoryview ne copient pas le raster
+    mv = memoryview(raw_bytes)
+    bands = []
+    for y in range(0, height, 255):
+        slice_h = min(255, height - y)
+        header = full_header if slice_h == 255 else _RASTER_HDR.pack(_RASTER_CMD, width_bytes, slice_h)
+        start = y * width_bytes
+        bands.append((y, slice_h, header, mv[start:start + slice_h * width_bytes]))
+
+    log(f"Raster: {width} px ({width_bytes} bytes/ligne) x {height} lignes, {len(bands)} bandes")
+    return width_bytes, height, bands
+
+
+def assemble_raster(bands) -> bytes:
+    """Concatène toutes les bandes (en-têtes GS v 0 + données) en un seul buffer."""
+    return b''.join(part for _, _, header, block in bands for part in (header, block))
+
+
+@functools.lru_cache(maxsize=4)
+def encode_payload(path: str,
+                   mtime_ns: int,
+                   target_w: int,
+                   contrast: float,
+                   gamma: float,
+                   use_dither: bool,
+                   threshold: int,
+                   autorotate: bool,
+                   invert: bool,
+                   limit_lines: int | None,
+                   preview: str | None) -> bytes:
+    """
+    Flux ESC/POS complet (init + bandes GS v 0 + fin) pour une image.
+    Mémoïsé : les copies suivantes (même fichier, même mtime, mêmes réglages)
+    ne redécodent / redimensionnent / ditherisent pas l'image.
+    """
+    width, height, raw_bytes = prepare_image(path, target_w, contrast, gamma, use_dither,
+                                             threshold, autorotate, preview)
+    _, _, bands = build_raster_bands(width, height, raw_bytes, invert, limit_lines)
+    return _INIT_PROLOGUE + assemble_raster(bands) + _END_EPILOGUE
+
+
+def job_payload(args: argparse.Namespace, image_path: str, width: int) -> bytes:
+    """Flux ESC/POS d'un job d'impression (cache invalidé si le fichier image change)."""
+    hits = encode_payload.cache_info().hits
+    payload = encode_payload(image_path, os.stat(image_path).st_mtime_ns, int(width),
+                             args.contrast, args.gamma, not args.no_dither, args.threshold,
+                             not args.no_autorotate, args.invert, args.limit_lines, args.preview)
+    if encode_payload.cache_info().hits > hits:
+        log(f"Flux ESC/POS en cache: {image_path} ({len(payload)} octets)")
+    return payload
+
+
+def transfer_timeout(nbytes: int, baud: int) -> float:
+    """
+    write_timeout pour un write() unique de nbytes : pyserial applique le timeout
+    à l'appel entier, il doit donc couvrir la durée du transfert (8N1 = 10 bits/octet).
+    """
+    return nbytes * 10 / int(baud) + WRITE_TIMEOUT
+
+
+def send_payload(ser: serial.Serial, payload: bytes):
+    """Envoi du flux complet en un seul write(), le driver/UART cadence le transfert."""
+    ser.reset_input_buffer()
+    ser.reset_output_buffer()
+    default_timeout = ser.write_timeout
+    ser.write_timeout = transfer_timeout(len(payload), ser.baudrate)
+    try:
+        ser.write(payload)
+        ser.flush()
+    except BaseException:
+        # Restauration au mieux : sur un port mort, la reconfiguration peut lever
+        # sa propre SerialException et masquer l'erreur d'écriture d'origine
+        with contextlib.suppress(Exception):
+            ser.write_timeout = default_timeout
+        raise
+    ser.write_timeout = default_timeout
+    log(f"Raster envoyé ({len(payload)} octets, écriture unique)")
 
 
 def send_raster(ser: serial.Serial,
-                img1: Image.Image,
+                width: int,
+                height: int,
                 raw_bytes: bytes,
                 invert: bool,
                 limit_lines: int | None,
                 chunk: int,
                 line_sleep: float):
-    """Envoi du raster en bandes, avec sous-écritures et pauses tampon."""
+    """Envoi du raster en bandes, avec sous-écritures et pauses tampon (--line-sleep > 0)."""
     ser.reset_input_buffer()
     ser.reset_output_buffer()
-    ser.write(b'\x1b@')   # ESC @ init
-    ser.write(b'\x1b2')   # interligne par défaut
+    ser.write(_INIT_PROLOGUE)
 
-    width_bytes, height, bands = build_raster_bands(img1, raw_bytes, invert, limit_lines)
+    width_bytes, height, bands = build_raster_bands(width, height, raw_bytes, invert, limit_lines)
     sent_lines = 0
     band_idx = 0
 
-    for y, slice_h, header, block in bands():
+    for y, slice_h, header, block in bands:
         band_idx += 1
         ser.write(header)
         L = len(block)
@@ -231,34 +430,37 @@ def send_raster(ser: serial.Serial,
         log(f"  - Bande {band_idx}: lignes {y}..{y + slice_h - 1} (envoyées: {sent_lines}/{height})")
         time.sleep(line_sleep)
 
-    ser.write(b'\n\n\n')
-    ser.write(b'\x1dV\x01')  # cut partiel si supporté
+    ser.write(_END_EPILOGUE)
     ser.flush()
     log("Raster envoyé")
 
 
-def write_raster_to_file(img1: Image.Image,
-                         raw_bytes: bytes,
-                         out_path: str,
-                         invert: bool,
-                         limit_lines: int | None):
-    """Génère le flux ESC/POS vers un fichier (debug / dry-run)."""
-    _, _, bands = build_raster_bands(img1, raw_bytes, invert, limit_lines)
+def write_payload_to_file(payload: bytes, out_path: str):
+    """Écrit le flux ESC/POS dans un fichier (debug / dry-run)."""
     with open(out_path, 'wb') as f:
-        f.write(b'\x1b@')
-        f.write(b'\x1b2')
-        for _, _, header, block in bands():
-            f.write(header)
-            f.write(block)
-        f.write(b'\n\n\n\x1dV\x01')
+        f.write(payload)
     log(f"Flux ESC/POS écrit dans {out_path}")
 
 
-def parse_args():
-    p = argparse.ArgumentParser(description="ESC/POS raster (GS v 0) avec logs/preview/dry-run")
+class _JobArgumentParser(argparse.ArgumentParser):
+    """Parser des jobs internes (plugin / worker) : lève RasterError au lieu de quitter le process."""
+
+    def error(self, message):
+        raise RasterError(f"Arguments invalides: {message}", 2)
+
+
+def parse_args(argv: list[str] | None = None):
+    """
+    Arguments de la ligne de commande (argv=None), ou d'un job interne (liste argv) :
+    dans ce cas une erreur lève RasterError(code 2) au lieu de sys.exit(2).
+    """
+    parser_cls = argparse.ArgumentParser if argv is None else _JobArgumentParser
+    p = parser_cls(description="ESC/POS raster (GS v 0) avec logs/preview/dry-run")
     # Maintenance
     p.add_argument("--cancel", nargs='?', const=True, help="Annuler/vider le buffer: --cancel <serial>")
     p.add_argument("--hello",  nargs='?', const=True, help="Test texte: --hello <serial>")
+    p.add_argument("--daemon", action="store_true",
+                   help="Worker: lit des jobs JSON (liste d'arguments) sur stdin, un par ligne")
 
     # Impression — syntaxe positionnelle
     p.add_argument("image", nargs='?')
@@ -283,19 +485,21 @@ def parse_args():
     p.add_argument("--limit-lines", type=int)
     p.add_argument("--no-autorotate", action="store_true")
     p.add_argument("--chunk", type=int, default=4096)
-    p.add_argument("--line-sleep", type=float, default=0.02)
-    return p.parse_args()
-
+    p.add_argument("--line-sleep", type=float, default=0.0)
+    return p.parse_args(argv)
 
-def main():
-    args = parse_args()
 
+def run(args: argparse.Namespace):
+    """
+    Exécute un job (maintenance ou impression) décrit par un Namespace de parse_args().
+    Lève RasterError / serial.SerialException au lieu de quitter le process,
+    pour pouvoir être appelé directement depuis le plugin Pibooth.
+    """
     # Modes maintenance: --cancel / --hello
     if args.cancel is True or (isinstance(args.cancel, str) and not args.image and not args.image_flag):
         dev = args.cancel if isinstance(args.cancel, str) else args.serial
         if not dev:
-            sys.stderr.write("Usage: --cancel <serial>\n")
-            sys.exit(2)
+            raise RasterError("Usage: --cancel <serial>", 2)
         with open_serial(dev, args.baud) as ser:
             cancel_and_reset(ser)
         log("Cancel/reset envoyé")
@@ -304,72 +508,134 @@ def main():
     if args.hello is True or (isinstance(args.hello, str) and not args.image and not args.image_flag):
         dev = args.hello if isinstance(args.hello, str) else args.serial
         if not dev:
-            sys.stderr.write("Usage: --hello <serial>\n")
-            sys.exit(2)
+            raise RasterError("Usage: --hello <serial>", 2)
         with open_serial(dev, args.baud) as ser:
             send_hello(ser)
         log("Hello OK")
         return
 
-    # Résolution des paramètres impression (positionnels OU flags)
+    image_path, serial_dev, width = resolve_print_job(args)
+
+    # Mode preview-only (ne PAS imprimer)
+    if args.dry_run:
+        write_payload_to_file(job_payload(args, image_path, width), args.dry_run)
+        return
+
+    # Impression réelle
+    with open_serial(serial_dev, args.baud) as ser:
+        print_job(ser, args)
+    log("Terminé")
+
+
+def resolve_print_job(args: argparse.Namespace) -> tuple[str, str, int]:
+    """Résout (image, port série, largeur) depuis les positionnels OU les flags."""
     image_path = args.image_flag or args.image
     serial_dev = args.serial_flag or args.serial
     width = args.width_flag if args.width_flag else args.width
 
     if not image_path or not serial_dev or not width:
-        sys.stderr.write(
+        raise RasterError(
             "Usage impression (2 formes) :\n"
             "  a) print_raster.py <image> <serial> <width> [--baud 9600] [options...]\n"
-            "  b) print_raster.py --print <image> --dev <serial> --width <px> [--baud 9600] [options...]\n"
+            "  b) print_raster.py --print <image> --dev <serial> --width <px> [--baud 9600] [options...]",
+            2
         )
-        sys.exit(2)
 
     if not os.path.exists(image_path):
-        sys.stderr.write(f"[ERREUR] Image introuvable: {image_path}\n")
-        sys.exit(3)
+        raise RasterError(f"Image introuvable: {image_path}", 3)
 
-    try:
-        use_dither = not args.no_dither
-        img1, raw = prepare_image(
+    return image_path, serial_dev, width
+
+
+def print_job(ser: serial.Serial, args: argparse.Namespace):
+    """
+    Imprime un job sur un port déjà ouvert (réutilisable pour plusieurs copies).
+    Le flux est mémoïsé : une copie supplémentaire ne fait que le renvoyer.
+    """
+    image_path, _, width = resolve_print_job(args)
+
+    if args.pre_cancel:
+        cancel_and_reset(ser)
+
+    if args.line_sleep > 0:
+        # Envoi par bandes (opt-in firmwares capricieux)
+        img_w, img_h, raw = prepare_image(
             image_path,
             width,
             contrast=args.contrast,
             gamma=args.gamma,
-            use_dither=use_dither,
+            use_dither=(not args.no_dither),
             threshold=args.threshold,
             autorotate=(not args.no_autorotate),
             preview=args.preview
         )
+        send_raster(
+            ser,
+            img_w,
+            img_h,
+            raw,
+            invert=args.invert,
+            limit_lines=args.limit_lines,
+            chunk=args.chunk,
+            line_sleep=args.line_sleep
+        )
+    else:
+        send_payload(ser, job_payload(args, image_path, width))
+
+
+def describe_error(e: BaseException) -> tuple[int, str]:
+    """Code de sortie + message pour une exception levée par run()."""
+    if isinstance(e, RasterError):
+        return e.exit_code, str(e)
+    if serial is not None and isinstance(e, serial.SerialTimeoutException):
+        return 11, f"Timeout écriture: {e}"
+    if serial is not None and isinstance(e, serial.SerialException):
+        return 10, f"Série: {e}"
+    return 12, f"{type(e).__name__}: {e}"
+
+
+def run_daemon():
+    """
+    Mode worker (--daemon) : une ligne JSON par job sur stdin, une ligne JSON de statut
+    par job sur stdout.
+      job    : liste d'arguments (mêmes options que la CLI)
+               ou {"argv": [...], "log": false} pour ne pas renvoyer les logs
+      statut : {"ok": true, "log": "..."} ou {"ok": false, "code": N, "error": "...", "log": "..."}
+    """
+    log("Worker démarré (--daemon)")
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        job = json.loads(line)
+        if isinstance(job, dict):
+            argv, keep = job.get("argv", []), job.get("log", True)
+        else:
+            argv, keep = job, True
+        status = {"ok": True}
+        with capture_log(keep) as output:
+            try:
+                run(parse_args(argv))
+            except Exception as e:
+                code, msg = describe_error(e)
+                status = {"ok": False, "code": code, "error": msg}
+        status["log"] = output.getvalue()
+        sys.stdout.write(json.dumps(status) + "\n")
+        sys.stdout.flush()
+    log("Worker arrêté (stdin fermé)")
 
-        # Mode preview-only (ne PAS imprimer)
-        if args.dry_run:
-            write_raster_to_file(img1, raw, args.dry_run, invert=args.invert, limit_lines=args.limit_lines)
-            return
-
-        # Impression réelle
-        with open_serial(serial_dev, args.baud) as ser:
-            if args.pre_cancel:
-                cancel_and_reset(ser)
-            send_raster(
-                ser,
-                img1,
-                raw,
-                invert=args.invert,
-                limit_lines=args.limit_lines,
-                chunk=args.chunk,
-                line_sleep=args.line_sleep
-            )
-        log("Terminé")
-
-    except serial.SerialTimeoutException as e:
-        sys.stderr.write(f"[ERREUR] Timeout écriture: {e}\n")
-        sys.exit(11)
-    except serial.SerialException as e:
-        sys.stderr.write(f"[ERREUR] Série: {e}\n")
-        sys.exit(10)
+
+def main():
+    args = parse_args()
+    try:
+        if args.daemon:
+            run_daemon()
+        else:
+            run(args)
     except Exception as e:
-        sys.stderr.write(f"[ERREUR] {type(e).__name__}: {e}\n")
-        sys.exit(12)
+        code, msg = describe_error(e)
+        sys.stderr.write(f"[ERREUR] {msg}\n")
+        sys.exit(code)
 
 
 if __name__ == "__main__":